@@ -1,17 +1,198 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
+from pybloom_live import ScalableBloomFilter
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+import re
+import codecs
 import sys
 import time
 import json
 import csv
+import threading
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+from functools import lru_cache
+from itertools import chain
+from dataclasses import dataclass, asdict
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
+
+try:
+    # Optional: several times faster than the json module on large reports
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: a libuv-based event loop with cheaper I/O dispatch than asyncio's
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+# Status codes servers send when they reject HEAD but may still serve GET
+HEAD_UNSUPPORTED_STATUSES = (405, 501)
+NOT_MODIFIED = 304
+# Statuses from here up count as broken links
+BROKEN_STATUS_MIN = 400
+# Only pages of these types are parsed, and only their first MAX_PAGE_BYTES
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+MAX_PAGE_BYTES = 1024 * 1024
+# Scheme and netloc (host plus any port/userinfo, as urlparse splits it) of a
+# crawlable URL
+_URL_RE = re.compile(r'^(?:https?|ftp)://([^/?#]+)', re.IGNORECASE)
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">,
+# looked for in the first META_SNIFF_BYTES as browsers do
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)',
+                              re.IGNORECASE)
+META_SNIFF_BYTES = 1024
+
+# Explicit __slots__ (rather than dataclass(slots=True)) keeps these usable on
+# Python < 3.10
+@dataclass
+class LinkResult:
+    """A link that answered with an HTTP status (working or broken)"""
+    __slots__ = ('url', 'status_code', 'final_url', 'timestamp')
+    url: str
+    status_code: int
+    final_url: str
+    timestamp: str
+
+@dataclass
+class LinkError:
+    """A link or page that could not be fetched at all"""
+    __slots__ = ('url', 'error', 'type', 'timestamp')
+    url: str
+    error: str
+    type: str
+    timestamp: str
+
+class URLHashSet:
+    """Set of URLs that stores only each URL's hash, not the string itself.
+    
+    A small int per entry instead of a full URL keeps large crawls lean; a
+    false match needs a 64-bit hash collision. Deliberately not a set
+    subclass: only these methods hash their argument, so nothing else is offered.
+    """
+    __slots__ = ('_hashes',)
+    
+    def __init__(self, urls=()):
+        self._hashes = {hash(url) for url in urls}
+    
+    def add(self, url):
+        self._hashes.add(hash(url))
+    
+    def discard(self, url):
+        self._hashes.discard(hash(url))
+    
+    def __contains__(self, url):
+        return hash(url) in self._hashes
+    
+    def __len__(self):
+        return len(self._hashes)
+
+@lru_cache(maxsize=4096)
+def _netloc_of(url):
+    """Netloc of a crawlable URL, or None; cached since pages repeat the same links"""
+    match = _URL_RE.match(url)
+    return match.group(1) if match else None
+
+def _known_codec(name):
+    """name if Python has a codec for it, else None"""
+    if not name:
+        return None
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name
+
+def _decode_page(content, charset=None):
+    """Decode a page body for parsing.
+    
+    Uses the Content-Type charset, then a <meta charset> in the first bytes, then
+    UTF-8; undecodable bytes become U+FFFD rather than failing the page.
+    """
+    encoding = _known_codec(charset)
+    if encoding is None:
+        match = _META_CHARSET_RE.search(content, 0, META_SNIFF_BYTES)
+        encoding = _known_codec(match and match.group(1).decode('ascii')) or 'utf-8'
+    return content.decode(encoding, errors='replace')
+
+def dumps_json(obj):
+    """Serialize obj to indented UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def run_async(coro):
+    """Run coro to completion, on uvloop when it is installed"""
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
+
+def create_async_client(max_connections=100, max_keepalive_connections=20):
+    """Create a shared HTTP/2 client for crawl_website_async.
+    
+    Over HTTPS, requests to the same host are multiplexed on one connection;
+    plain HTTP servers and servers without HTTP/2 fall back to HTTP/1.1.
+    """
+    # Imported here: httpx is the slowest import and the threaded crawler never needs it
+    import httpx  # noqa: PLC0415
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_keepalive_connections),
+        timeout=10.0,
+        follow_redirects=True,
+        headers={'User-Agent': USER_AGENT}
+    )
+
+def configure_logging(level=logging.INFO):
+    """Print progress messages to stdout from a background thread.
+    
+    Worker threads only enqueue records, so a slow terminal never stalls the crawl.
+    Returns the started QueueListener; stop() it to flush before exiting. Calling
+    this again only changes the level, so messages are never printed twice.
+    """
+    logger.setLevel(level)
+    for installed in logger.handlers:
+        listener = getattr(installed, 'progress_listener', None)
+        if listener is not None:
+            return listener
+    
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = QueueListener(log_queue, handler)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.progress_listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    return listener
 
 class BrokenLinkChecker:
-    def __init__(self, max_urls=100, max_depth=2, delay=1.0, same_domain_only=True):
-        self.visited_urls = set()
-        self.checked_urls = set()
+    def __init__(self, max_urls=100, max_depth=2, delay=1.0, same_domain_only=True,
+                 workers=10, max_per_host=4, previous_page_cache=None):
+        # Semaphore(0) would block every request forever rather than fail
+        if workers < 1 or max_per_host < 1:
+            raise ValueError("workers and max_per_host must be at least 1")
+        # Normalized URLs, hashed; see URLHashSet
+        self.visited_urls = URLHashSet()
+        self.checked_urls = URLHashSet()
+        # Normalized URLs ever pushed onto the crawl frontier, see _queue_links
+        self.queued_bloom = ScalableBloomFilter(initial_capacity=10_000,
+                                                error_rate=0.001)
         self.broken_links = []
         self.working_links = []
         self.error_links = []
@@ -19,153 +200,455 @@ class BrokenLinkChecker:
         self.max_depth = max_depth
         self.delay = delay
         self.same_domain_only = same_domain_only
+        self.workers = workers
+        self.max_per_host = max_per_host
+        self.start_url = None
         self.start_domain = None
+        # Normalized page URL -> {'etag', 'last_modified', 'links'} for pages crawled
+        # this run; a previous run's cache turns repeat fetches into conditional GETs
+        self.page_cache = {}
+        self.previous_page_cache = previous_page_cache or {}
         self.urls_processed = 0
         self.start_time = datetime.now()
+        self.session = self._create_session()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # Guards checked_urls, the result lists and urls_processed across worker threads
+        self._lock = threading.Lock()
+        self._results_cache = None
+        self._results_cache_version = None
+        self._host_slots = defaultdict(
+            lambda: threading.Semaphore(self.max_per_host))
+        self._async_host_slots = defaultdict(
+            lambda: asyncio.Semaphore(self.max_per_host))
+        # Hosts known to reject HEAD are checked with a streamed GET straight away
+        self.head_ok = {}
         
-    def is_valid_url(self, url):
+    def _create_session(self):
+        """Create a pooled session so requests to the same host reuse connections"""
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                        raise_on_status=False)
+        # pool_maxsize is per host: room for every checker slot plus the page fetch,
+        # so a large --max-per-host never has connections discarded after use
+        adapter = HTTPAdapter(pool_connections=32,
+                              pool_maxsize=max(64, self.max_per_host + 1),
+                              max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+    
+    @contextmanager
+    def _host_slot(self, host):
+        """Take one of host's max_per_host slots, pausing `delay` before freeing it.
+        
+        So at most max_per_host requests to a host are in flight, and each slot sends
+        at most one request per `delay`.
+        """
+        with self._lock:
+            slot = self._host_slots[host]
+        with slot:
+            try:
+                yield
+            finally:
+                # Add delay to be respectful to the server
+                if self.delay > 0:
+                    time.sleep(self.delay)
+    
+    @asynccontextmanager
+    async def _async_host_slot(self, host):
+        """Async counterpart of _host_slot"""
+        async with self._async_host_slots[host]:
+            try:
+                yield
+            finally:
+                if self.delay > 0:
+                    await asyncio.sleep(self.delay)
+    
+    def _normalize(self, url):
+        """Canonical form of url used to deduplicate checks and crawled pages.
+        
+        Lowercases scheme and host, drops the fragment and default port and sorts
+        query parameters, so e.g. http://X.com:80/a?b=1&a=2#top == http://x.com/a?a=2&b=1.
+        """
         parsed = urlparse(url)
-        return bool(parsed.netloc) and bool(parsed.scheme)
+        scheme = parsed.scheme.lower()
+        netloc = parsed.netloc.lower()
+        default_port = DEFAULT_PORTS.get(scheme)
+        if default_port and netloc.endswith(default_port):
+            netloc = netloc[:-len(default_port)]
+        query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+        return urlunparse((scheme, netloc, parsed.path, parsed.params, query, ''))
+    
+    def is_valid_url(self, url):
+        return _netloc_of(url) is not None
+    
+    @property
+    def start_domain(self):
+        return self._start_domain
+    
+    @start_domain.setter
+    def start_domain(self, domain):
+        # Precompute what a same-domain URL starts with: the netloc must end at a
+        # delimiter, so example.com matches neither example.com.evil nor
+        # example.com:8080
+        self._start_domain = domain
+        roots = tuple(f"{scheme}://{domain}" for scheme in ('http', 'https', 'ftp'))
+        self._domain_roots = frozenset(roots)
+        self._domain_prefixes = tuple(
+            root + sep for root in roots for sep in ('/', '?', '#'))
     
     def is_same_domain(self, url):
         if not self.same_domain_only or not self.start_domain:
             return True
-        parsed = urlparse(url)
-        return parsed.netloc == self.start_domain
+        return url.startswith(self._domain_prefixes) or url in self._domain_roots
+    
+    def _extract_links(self, url, content):
+        """Return the valid (and, if configured, same-domain) links found in a page.
+        
+        content is the decoded page text, see _decode_page; lexbor itself would read
+        bytes as UTF-8 whatever the page declares.
+        """
+        # Copy the distinct hrefs out in document order (navigation repeats the same
+        # href many times per page) and free the DOM before resolving them, so the
+        # tree and the resolved links are never held in memory at once
+        tree = LexborHTMLParser(content)
+        # attrs reads one attribute; attributes would build a dict of all of them
+        hrefs = dict.fromkeys(node.attrs.get('href') for node in tree.css("a[href]"))
+        del tree
+        
+        # Keyed on the normalized URL, keeping the first spelling seen for reporting
+        links = {}
+        
+        # Bind everything the loop touches to locals
+        same_domain_only = self.same_domain_only
+        is_valid_url = self.is_valid_url
+        is_same_domain = self.is_same_domain
+        normalize = self._normalize
+        add_link = links.setdefault
+        
+        for href_attr in hrefs:
+            if not href_attr:
+                continue
+            full_url = urljoin(url, href_attr)
+            if is_valid_url(full_url):
+                # Filter by domain if same_domain_only is True
+                if same_domain_only and not is_same_domain(full_url):
+                    continue
+                add_link(normalize(full_url), full_url)
+        
+        return set(links.values())
+    
+    def _claim(self, url):
+        """Reserve a check for url.
+        
+        Returns its position, or None if already checked or over the limit.
+        """
+        key = self._normalize(url)
+        with self._lock:
+            if key in self.checked_urls or self.urls_processed >= self.max_urls:
+                return None
+            self.checked_urls.add(key)
+            self.urls_processed += 1
+            return self.urls_processed
+    
+    def _record_status(self, url, status_code, final_url):
+        result = LinkResult(url, status_code, final_url, datetime.now().isoformat())
+        if status_code >= BROKEN_STATUS_MIN:
+            logger.info("  ❌ [BROKEN] %s Status code: %s", url, status_code)
+            with self._lock:
+                self.broken_links.append(result)
+        else:
+            logger.debug("  ✅ [OK] %s Status code: %s", url, status_code)
+            with self._lock:
+                self.working_links.append(result)
+    
+    def _record_error(self, url, error, error_type):
+        with self._lock:
+            # Timeouts from asyncio carry no message, fall back to the exception name
+            self.error_links.append(LinkError(
+                url, str(error) or type(error).__name__, error_type,
+                datetime.now().isoformat()
+            ))
+    
+    def _is_html(self, content_type):
+        # A missing Content-Type is given the benefit of the doubt
+        if not content_type:
+            return True
+        return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+    
+    def _conditional_headers(self, key):
+        cached = self.previous_page_cache.get(key)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+    
+    def _remember_page(self, key, response_headers, links):
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        # Without a validator the page can't be revalidated next time, so don't keep it
+        if etag or last_modified:
+            self.page_cache[key] = {
+                'etag': etag, 'last_modified': last_modified, 'links': sorted(links)
+            }
     
     def get_all_links(self, url):
-        links = set()
         try:
-            print(f"[*] Extracting links from: {url}")
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Get all anchor tags with href
-            for a_tag in soup.find_all("a", href=True):
+            logger.debug("[*] Extracting links from: %s", url)
+            key = self._normalize(url)
+            # Page fetches share the per-host cap and delay with link checks
+            with self._host_slot(urlparse(url).netloc):
+                response = self.session.get(url, stream=True, timeout=10,
+                                            headers=self._conditional_headers(key))
                 try:
-                    href_attr = a_tag.attrs.get('href', '')
-                    if href_attr and isinstance(href_attr, str):
-                        full_url = urljoin(url, href_attr)
-                        if self.is_valid_url(full_url):
-                            # Filter by domain if same_domain_only is True
-                            if self.same_domain_only and not self.is_same_domain(full_url):
-                                continue
-                            links.add(full_url)
-                except (AttributeError, KeyError):
-                    # Skip tags that don't have proper href attributes
-                    continue
-                    
+                    not_modified = response.status_code == NOT_MODIFIED
+                    if not_modified and key in self.previous_page_cache:
+                        # Unchanged since the previous scan, reuse its links, no body
+                        self.page_cache[key] = self.previous_page_cache[key]
+                        return set(self.page_cache[key]['links'])
+                    if not self._is_html(response.headers.get('Content-Type', '')):
+                        return set()
+                    content = response.raw.read(MAX_PAGE_BYTES, decode_content=True)
+                finally:
+                    response.close()
+            # Only an explicit charset counts; requests would otherwise assume
+            # ISO-8859-1 for any text/* type and hide a <meta charset>
+            content_type = response.headers.get('Content-Type', '')
+            charset = (get_encoding_from_headers(response.headers)
+                       if 'charset' in content_type.lower() else None)
+            links = self._extract_links(url, _decode_page(content, charset))
+            self._remember_page(key, response.headers, links)
+            return links
         except Exception as e:
-            print(f"[!] Error getting links from {url}: {e}")
-            self.error_links.append({
-                'url': url, 
-                'error': str(e), 
-                'type': 'extraction',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        return links
+            logger.warning("[!] Error getting links from %s: %s", url, e)
+            self._record_error(url, e, 'extraction')
+            return set()
     
     def check_link(self, url):
-        if url in self.checked_urls:
+        position = self._claim(url)
+        if position is None:
             return
-            
-        self.checked_urls.add(url)
-        self.urls_processed += 1
         
         try:
-            print(f"[{self.urls_processed}/{self.max_urls}] Checking: {url}")
-            response = requests.head(url, allow_redirects=True, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            
-            if response.status_code >= 400:
-                print(f"  ❌ [BROKEN] Status code: {response.status_code}")
-                self.broken_links.append({
-                    'url': url, 
-                    'status_code': response.status_code,
-                    'final_url': response.url,
-                    'timestamp': datetime.now().isoformat()
-                })
-            else:
-                print(f"  ✅ [OK] Status code: {response.status_code}")
-                self.working_links.append({
-                    'url': url, 
-                    'status_code': response.status_code,
-                    'final_url': response.url,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
+            logger.debug("[%d/%d] Checking: %s", position, self.max_urls, url)
+            host = urlparse(url).netloc
+            with self._host_slot(host):
+                response = None
+                if self.head_ok.get(host, True):
+                    response = self.session.head(url, allow_redirects=True, timeout=10)
+                    if response.status_code in HEAD_UNSUPPORTED_STATUSES:
+                        self.head_ok[host] = False
+                        response = None
+                if response is None:
+                    # Only the status line and headers are needed, never read the body
+                    response = self.session.get(url, allow_redirects=True, stream=True,
+                                                timeout=10)
+                    response.close()
+            self._record_status(url, response.status_code, response.url)
         except Exception as e:
-            print(f"  ⚠️  [ERROR] {e}")
-            self.error_links.append({
-                'url': url, 
-                'error': str(e), 
-                'type': 'check',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Add delay to be respectful to the server
-        if self.delay > 0:
-            time.sleep(self.delay)
+            logger.warning("  ⚠️  [ERROR] %s %s", url, e)
+            self._record_error(url, e, 'check')
     
-    def crawl_website(self, start_url, current_depth=0):
-        if current_depth > self.max_depth or self.urls_processed >= self.max_urls:
-            return
-            
-        if start_url in self.visited_urls:
+    async def get_all_links_async(self, client, url):
+        try:
+            logger.debug("[*] Extracting links from: %s", url)
+            key = self._normalize(url)
+            headers = self._conditional_headers(key)
+            async with self._async_host_slot(urlparse(url).netloc), \
+                    client.stream("GET", url, headers=headers) as response:
+                not_modified = response.status_code == NOT_MODIFIED
+                if not_modified and key in self.previous_page_cache:
+                    # Unchanged since the previous scan, reuse its links without a body
+                    self.page_cache[key] = self.previous_page_cache[key]
+                    return set(self.page_cache[key]['links'])
+                if not self._is_html(response.headers.get('Content-Type', '')):
+                    return set()
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= MAX_PAGE_BYTES:
+                        break
+            content = b''.join(chunks)[:MAX_PAGE_BYTES]
+            links = self._extract_links(
+                url, _decode_page(content, response.charset_encoding))
+            self._remember_page(key, response.headers, links)
+            return links
+        except Exception as e:
+            logger.warning("[!] Error getting links from %s: %s", url, e)
+            self._record_error(url, e, 'extraction')
+            return set()
+    
+    async def check_link_async(self, client, url):
+        position = self._claim(url)
+        if position is None:
             return
-            
-        self.visited_urls.add(start_url)
         
+        try:
+            logger.debug("[%d/%d] Checking: %s", position, self.max_urls, url)
+            host = urlparse(url).netloc
+            async with self._async_host_slot(host):
+                status_code = None
+                if self.head_ok.get(host, True):
+                    response = await client.head(url)
+                    status_code, final_url = response.status_code, str(response.url)
+                    if status_code in HEAD_UNSUPPORTED_STATUSES:
+                        self.head_ok[host] = False
+                        status_code = None
+                if status_code is None:
+                    # Leaving the context without reading releases the body unread
+                    async with client.stream("GET", url) as response:
+                        status_code, final_url = response.status_code, str(response.url)
+            self._record_status(url, status_code, final_url)
+        except Exception as e:
+            logger.warning("  ⚠️  [ERROR] %s %s", url, e)
+            self._record_error(url, e, 'check')
+    
+    def _queue_links(self, frontier, links, depth):
+        """Push links onto the crawl frontier unless they were queued before.
+        
+        A link that appears on every page would otherwise be queued once per page.
+        The Bloom filter rejects repeats without keeping every URL string around;
+        visited_urls stays the exact check when a link is popped. A false positive
+        (about 0.1%) can only skip crawling a page, never crawl one twice.
+        """
+        for link in links:
+            key = self._normalize(link)
+            if key in self.queued_bloom:
+                continue
+            self.queued_bloom.add(key)
+            frontier.append((link, depth))
+    
+    def crawl_website(self, start_url):
+        """Breadth-first crawl from start_url.
+        
+        Links found on each page are checked by the thread pool.
+        """
         # Set start domain for filtering
         if self.start_domain is None:
-            parsed = urlparse(start_url)
-            self.start_domain = parsed.netloc
+            self.start_url = start_url
+            self.start_domain = urlparse(start_url).netloc
         
-        print(f"\n[🕷️ ] Crawling (depth {current_depth}): {start_url}")
+        frontier = deque()
+        self._queue_links(frontier, [start_url], 0)
+        while frontier and self.urls_processed < self.max_urls:
+            url, depth = frontier.popleft()
+            key = self._normalize(url)
+            if depth > self.max_depth or key in self.visited_urls:
+                continue
+            self.visited_urls.add(key)
+            
+            logger.info("\n[🕷️ ] Crawling (depth %d): %s", depth, url)
+            
+            # Check the current URL
+            self.check_link(url)
+            
+            if self.urls_processed >= self.max_urls:
+                logger.info("\n[*] Reached maximum URL limit (%d). Stopping crawl.",
+                            self.max_urls)
+                break
+            
+            # Get all links from current page
+            links = self.get_all_links(url)
+            
+            # Check each link on the page concurrently; check_link stops at max_urls
+            list(self.executor.map(self.check_link, links))
+            
+            # Queue the links for crawling at the next depth
+            if depth < self.max_depth:
+                self._queue_links(frontier, links, depth + 1)
+    
+    async def crawl_website_async(self, start_url, client=None):
+        """Breadth-first crawl on one event loop, checking `workers` links at a time.
         
-        # Check the current URL
-        self.check_link(start_url)
+        Pass a client from create_async_client() to share its connection pool
+        between scans; otherwise one is created for this crawl and closed afterwards.
+        """
+        owns_client = client is None
+        if owns_client:
+            client = create_async_client()
         
-        if self.urls_processed >= self.max_urls:
-            print(f"\n[*] Reached maximum URL limit ({self.max_urls}). Stopping crawl.")
-            return
+        if self.start_domain is None:
+            self.start_url = start_url
+            self.start_domain = urlparse(start_url).netloc
         
-        # Get all links from current page
-        links = self.get_all_links(start_url)
+        concurrency = asyncio.Semaphore(self.workers)
         
-        # Check each link found on the page
-        for link in links:
-            if self.urls_processed >= self.max_urls:
-                break
-                
-            self.check_link(link)
+        async def bounded_check(link):
+            async with concurrency:
+                await self.check_link_async(client, link)
         
-        # Recursively crawl links (only if we haven't hit the limit)
-        if current_depth < self.max_depth and self.urls_processed < self.max_urls:
-            for link in links:
+        try:
+            frontier = deque()
+            self._queue_links(frontier, [start_url], 0)
+            while frontier and self.urls_processed < self.max_urls:
+                url, depth = frontier.popleft()
+                key = self._normalize(url)
+                if depth > self.max_depth or key in self.visited_urls:
+                    continue
+                self.visited_urls.add(key)
+                
+                logger.info("\n[🕷️ ] Crawling (depth %d): %s", depth, url)
+                await self.check_link_async(client, url)
+                
                 if self.urls_processed >= self.max_urls:
+                    logger.info("\n[*] Reached maximum URL limit (%d). Stopping crawl.",
+                                self.max_urls)
                     break
-                self.crawl_website(link, current_depth + 1)
+                
+                links = await self.get_all_links_async(client, url)
+                await asyncio.gather(*(bounded_check(link) for link in links))
+                
+                if depth < self.max_depth:
+                    self._queue_links(frontier, links, depth + 1)
+        finally:
+            if owns_client:
+                await client.aclose()
+    
+    def _results_version(self):
+        # Extraction errors don't bump urls_processed, so count every result list;
+        # the ids catch a list being replaced wholesale (as checker_from_results does)
+        lists = (self.working_links, self.broken_links, self.error_links)
+        return (self.urls_processed, len(self.visited_urls),
+                *(len(results) for results in lists),
+                *(id(results) for results in lists))
     
     def get_results_json(self):
-        """Return results in JSON format"""
+        """Return results in JSON format.
+        
+        The dict is rebuilt only when the scan has progressed since the last call,
+        so callers must treat it as read-only.
+        """
+        version = self._results_version()
+        if self._results_cache is not None and self._results_cache_version == version:
+            return self._results_cache
+        
         end_time = datetime.now()
         duration = (end_time - self.start_time).total_seconds()
         
-        return {
+        results = {
             "scan_info": {
                 "start_time": self.start_time.isoformat(),
                 "end_time": end_time.isoformat(),
                 "duration_seconds": round(duration, 2),
+                "start_url": self.start_url,
                 "start_domain": self.start_domain,
                 "max_urls": self.max_urls,
                 "max_depth": self.max_depth,
                 "delay": self.delay,
-                "same_domain_only": self.same_domain_only
+                "same_domain_only": self.same_domain_only,
+                "workers": self.workers,
+                "max_per_host": self.max_per_host
             },
             "statistics": {
                 "total_urls_processed": self.urls_processed,
@@ -175,18 +658,21 @@ class BrokenLinkChecker:
                 "visited_pages_count": len(self.visited_urls)
             },
             "results": {
-                "working_links": self.working_links,
-                "broken_links": self.broken_links,
-                "error_links": self.error_links
+                "working_links": [asdict(link) for link in self.working_links],
+                "broken_links": [asdict(link) for link in self.broken_links],
+                "error_links": [asdict(link) for link in self.error_links]
             }
         }
+        self._results_cache = results
+        self._results_cache_version = version
+        return results
     
     def save_json_report(self, filename):
         """Save results to JSON file"""
         try:
             results = self.get_results_json()
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            with open(filename, 'wb') as f:
+                f.write(dumps_json(results))
             print(f"\n💾 JSON report saved to: {filename}")
             return True
         except Exception as e:
@@ -197,47 +683,19 @@ class BrokenLinkChecker:
         """Save results to CSV file"""
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['url', 'status', 'status_code', 'final_url', 'error', 'type', 'timestamp']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                # Write header
-                writer.writeheader()
-                
-                # Write working links
-                for link in self.working_links:
-                    writer.writerow({
-                        'url': link['url'],
-                        'status': 'working',
-                        'status_code': link['status_code'],
-                        'final_url': link['final_url'],
-                        'error': '',
-                        'type': '',
-                        'timestamp': link['timestamp']
-                    })
-                
-                # Write broken links
-                for link in self.broken_links:
-                    writer.writerow({
-                        'url': link['url'],
-                        'status': 'broken',
-                        'status_code': link['status_code'],
-                        'final_url': link['final_url'],
-                        'error': '',
-                        'type': '',
-                        'timestamp': link['timestamp']
-                    })
-                
-                # Write error links
-                for link in self.error_links:
-                    writer.writerow({
-                        'url': link['url'],
-                        'status': 'error',
-                        'status_code': '',
-                        'final_url': '',
-                        'error': link['error'],
-                        'type': link['type'],
-                        'timestamp': link['timestamp']
-                    })
+                # Header and tuple rows in column order, written by one writerows call
+                csv.writer(csvfile).writerows(chain(
+                    [('url', 'status', 'status_code', 'final_url', 'error', 'type',
+                      'timestamp')],
+                    ((link.url, 'working', link.status_code, link.final_url, '', '',
+                      link.timestamp)
+                     for link in self.working_links),
+                    ((link.url, 'broken', link.status_code, link.final_url, '', '',
+                      link.timestamp)
+                     for link in self.broken_links),
+                    ((link.url, 'error', '', '', link.error, link.type, link.timestamp)
+                     for link in self.error_links)
+                ))
             
             print(f"\n📊 CSV report saved to: {filename}")
             return True
@@ -262,12 +720,12 @@ class BrokenLinkChecker:
         if self.broken_links:
             print(f"\n❌ BROKEN LINKS ({len(self.broken_links)}):")
             for link in self.broken_links:
-                print(f"  • {link['url']} (Status: {link['status_code']})")
+                print(f"  • {link.url} (Status: {link.status_code})")
         
         if self.error_links:
             print(f"\n⚠️  ERROR LINKS ({len(self.error_links)}):")
             for link in self.error_links:
-                print(f"  • {link['url']} ({link['error']})")
+                print(f"  • {link.url} ({link.error})")
         
         print("\n" + "="*60)
         
@@ -278,33 +736,51 @@ class BrokenLinkChecker:
         if csv_output:
             self.save_csv_report(csv_output)
 
-def main():
-    if len(sys.argv) < 2:
+def main():  # noqa: PLR0912, PLR0915 - one flat argv-parsing if/elif chain
+    if len(sys.argv) <= 1:
         print("Usage: python broken_link_checker.py <website_url> [options]")
         print("\nOptions:")
         print("  --max-urls <number>     Maximum URLs to scan (default: 100)")
         print("  --max-depth <number>    Maximum crawl depth (default: 2)")
-        print("  --delay <seconds>       Delay between requests (default: 1)")
-        print("  --external              Include external links (default: same domain only)")
+        print("  --delay <seconds>       Pause after each request before its per-host")
+        print("                          slot is reused (default: 1)")
+        print("  --workers <number>      Concurrent link checks (default: 10)")
+        print("  --max-per-host <number> Concurrent requests per host; 1 sends one")
+        print("                          request per delay (default: 4)")
+        print("  --external              Include external links "
+              "(default: same domain only)")
+        print("  --async                 Crawl on one asyncio event loop over HTTP/2 "
+              "instead of threads")
         print("  --json <filename>       Save results to JSON file")
         print("  --csv <filename>        Save results to CSV file")
+        print("  --verbose               Show every checked link, not only broken ones")
+        print("  --quiet                 Only show errors and the final summary")
         print("\nExamples:")
-        print("  python broken_link_checker.py https://example.com")
-        print("  python broken_link_checker.py https://example.com --max-urls 500 --max-depth 3")
-        print("  python broken_link_checker.py https://example.com --external --delay 2")
-        print("  python broken_link_checker.py https://example.com --json results.json")
-        print("  python broken_link_checker.py https://example.com --csv results.csv")
-        print("  python broken_link_checker.py https://example.com --json results.json --csv results.csv")
-        print("  python broken_link_checker.py https://example.com --max-urls 1000 --json scan_results.json")
+        for example in (
+            "https://example.com",
+            "https://example.com --max-urls 500 --max-depth 3",
+            "https://example.com --external --delay 2",
+            "https://example.com --workers 20 --delay 0.5",
+            "https://example.com --async --workers 64",
+            "https://example.com --json results.json",
+            "https://example.com --csv results.csv",
+            "https://example.com --json results.json --csv results.csv",
+            "https://example.com --max-urls 1000 --json scan_results.json",
+        ):
+            print(f"  python broken_link_checker.py {example}")
         sys.exit(1)
     
     website_url = sys.argv[1]
     max_urls = 100
     max_depth = 2
     delay = 1.0
+    workers = 10
+    max_per_host = 4
     same_domain_only = True
+    use_async = False
     json_output = None
     csv_output = None
+    log_level = logging.INFO
     
     # Parse command line arguments
     i = 2
@@ -318,6 +794,12 @@ def main():
         elif sys.argv[i] == '--delay' and i + 1 < len(sys.argv):
             delay = float(sys.argv[i + 1])
             i += 2
+        elif sys.argv[i] == '--workers' and i + 1 < len(sys.argv):
+            workers = int(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--max-per-host' and i + 1 < len(sys.argv):
+            max_per_host = int(sys.argv[i + 1])
+            i += 2
         elif sys.argv[i] == '--json' and i + 1 < len(sys.argv):
             json_output = sys.argv[i + 1]
             i += 2
@@ -327,16 +809,31 @@ def main():
         elif sys.argv[i] == '--external':
             same_domain_only = False
             i += 1
+        elif sys.argv[i] == '--async':
+            use_async = True
+            i += 1
+        elif sys.argv[i] == '--verbose':
+            log_level = logging.DEBUG
+            i += 1
+        elif sys.argv[i] == '--quiet':
+            log_level = logging.WARNING
+            i += 1
         else:
             print(f"Unknown argument: {sys.argv[i]}")
             sys.exit(1)
     
+    if workers < 1 or max_per_host < 1:
+        print("--workers and --max-per-host must be at least 1")
+        sys.exit(1)
+    
     print("🔍 BROKEN LINK CHECKER STARTING")
     print("="*40)
     print(f"Target URL: {website_url}")
     print(f"Max URLs: {max_urls}")
     print(f"Max Depth: {max_depth}")
     print(f"Delay: {delay}s")
+    mode = ', async' if use_async else ''
+    print(f"Workers: {workers} ({max_per_host} per host{mode})")
     print(f"Domain Filter: {'Same domain only' if same_domain_only else 'All domains'}")
     if json_output:
         print(f"JSON Output: {json_output}")
@@ -344,18 +841,26 @@ def main():
         print(f"CSV Output: {csv_output}")
     print("="*40)
     
+    log_listener = configure_logging(log_level)
     checker = BrokenLinkChecker(
         max_urls=max_urls,
         max_depth=max_depth,
         delay=delay,
-        same_domain_only=same_domain_only
+        same_domain_only=same_domain_only,
+        workers=workers,
+        max_per_host=max_per_host
     )
     
     try:
-        checker.crawl_website(website_url)
+        if use_async:
+            run_async(checker.crawl_website_async(website_url))
+        else:
+            checker.crawl_website(website_url)
     except KeyboardInterrupt:
         print("\n[!] Scan interrupted by user")
     finally:
+        checker.close()
+        log_listener.stop()
         checker.print_summary(json_output, csv_output)
 
 if __name__ == "__main__":
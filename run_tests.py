@@ -7,93 +7,162 @@ Provides convenient commands to run different types of tests
 import sys
 import subprocess
 import argparse
+import hashlib
 import os
 
+# Run pip with this interpreter instead of whatever is first on PATH
+PIP = [sys.executable, "-m", "pip"]
+REQUIREMENTS_FILE = "test_requirements.txt"
+# Hash of the requirements file as of the last successful install
+DEPS_HASH_FILE = ".deps_hash"
+TEST_FILE = "test_broken_link_checker.py"
+# Arguments shared by every pytest run; helpers extend a copy
+PYTEST_BASE = [TEST_FILE, "-v"]
+
 
 def run_command(cmd, description=""):
-    """Run a command and return the result"""
+    """Run an argv list without a shell, streaming its output as it runs"""
     if description:
         print(f"\n🔍 {description}")
         print("-" * 50)
+    sys.stdout.flush()
     
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
+        result = subprocess.run(cmd, check=False)
         return result.returncode == 0
     except Exception as e:
         print(f"❌ Error running command: {e}")
         return False
 
 
-def install_dependencies():
-    """Install test dependencies"""
+# Set once pytest.main() has run in this process; see run_pytest
+_pytest_main_used = False
+
+
+def run_pytest(args, description=""):
+    """Run pytest, in this process the first time and in a fresh interpreter after that.
+    
+    pytest.main() is only safe once per process: a later session finds the code under
+    test already imported, so e.g. coverage of a chained --all run comes out wrong.
+    """
+    global _pytest_main_used
+    if _pytest_main_used:
+        return run_command([sys.executable, "-m", "pytest"] + args, description)
+    
+    # Imported here so --install works in a fresh environment without pytest
+    import pytest
+    
+    if description:
+        print(f"\n🔍 {description}")
+        print("-" * 50)
+    _pytest_main_used = True
+    return pytest.main(args) == 0
+
+
+def class_args(name):
+    """PYTEST_BASE narrowed to one test class"""
+    return [f"{PYTEST_BASE[0]}::{name}", *PYTEST_BASE[1:]]
+
+
+def parallel_args(jobs="auto"):
+    """pytest-xdist options; loadfile keeps each test class on a single worker"""
+    return ["-n", str(jobs), "--dist=loadfile"]
+
+
+def install_dependencies(force=False):
+    """Install test dependencies, unless the requirements are unchanged since the last install"""
+    with open(REQUIREMENTS_FILE, "rb") as f:
+        deps_hash = hashlib.sha256(f.read()).hexdigest()
+    if not force and os.path.exists(DEPS_HASH_FILE):
+        with open(DEPS_HASH_FILE) as f:
+            if f.read().strip() == deps_hash:
+                print("📦 Test dependencies unchanged, skipping install (use --force-install to reinstall)")
+                return True
+    
     print("📦 Installing test dependencies...")
-    return run_command("pip install -r test_requirements.txt")
+    if not run_command(PIP + ["install", "-r", REQUIREMENTS_FILE]):
+        return False
+    with open(DEPS_HASH_FILE, "w") as f:
+        f.write(deps_hash)
+    return True
 
 
-def run_unit_tests():
+def run_unit_tests(jobs="auto"):
     """Run unit tests only"""
-    cmd = "pytest test_broken_link_checker.py::TestBrokenLinkChecker -v"
-    return run_command(cmd, "Running unit tests")
+    args = class_args("TestBrokenLinkChecker") + parallel_args(jobs)
+    return run_pytest(args, "Running unit tests")
 
 
-def run_integration_tests():
-    """Run integration tests only"""
-    cmd = "pytest test_broken_link_checker.py::TestBrokenLinkCheckerIntegration -v"
-    return run_command(cmd, "Running integration tests")
+def run_integration_tests(jobs="auto"):
+    """Run integration tests only, each forked into its own process (pytest-forked)"""
+    # Each crawl drives thread pools and an event loop, so only this command pays
+    # for a fork per test; the others (and --cov, which loses forked children's
+    # data) keep reusing their xdist workers' interpreters
+    args = class_args("TestBrokenLinkCheckerIntegration") + ["--forked"] + parallel_args(jobs)
+    return run_pytest(args, "Running integration tests")
 
 
-def run_edge_case_tests():
+def run_edge_case_tests(jobs="auto"):
     """Run edge case tests"""
-    cmd = "pytest test_broken_link_checker.py::TestBrokenLinkCheckerEdgeCases -v"
-    return run_command(cmd, "Running edge case tests")
+    args = class_args("TestBrokenLinkCheckerEdgeCases") + parallel_args(jobs)
+    return run_pytest(args, "Running edge case tests")
 
 
-def run_all_tests():
+def run_all_tests(jobs="auto"):
     """Run all tests with coverage"""
-    cmd = "pytest test_broken_link_checker.py -v --cov=broken_link_checker --cov-report=html --cov-report=term"
-    return run_command(cmd, "Running all tests with coverage")
+    # pytest-cov combines the xdist workers' data itself and starts from a clean slate
+    args = PYTEST_BASE + parallel_args(jobs) + [
+        "--cov=broken_link_checker", "--cov-report=html", "--cov-report=term"]
+    return run_pytest(args, "Running all tests with coverage")
 
 
-def run_quick_tests():
+def run_quick_tests(jobs="auto", cache=False):
     """Run quick tests (excluding slow ones)"""
-    cmd = "pytest test_broken_link_checker.py -v -m 'not slow'"
-    return run_command(cmd, "Running quick tests")
+    args = PYTEST_BASE + ["-m", "not slow"] + parallel_args(jobs)
+    if not cache:
+        # Skip writing .pytest_cache unless asked; --lf/--ff need it from an earlier run
+        args += ["-p", "no:cacheprovider"]
+    return run_pytest(args, "Running quick tests")
+
+
+def run_last_failed():
+    """Re-run only the tests that failed last time, stopping at the first failure"""
+    args = PYTEST_BASE + ["--lf", "-x"]
+    return run_pytest(args, "Running last failed tests")
+
 
+def run_failed_first(jobs="auto"):
+    """Run all tests, starting with the ones that failed last time"""
+    args = PYTEST_BASE + ["--ff"] + parallel_args(jobs)
+    return run_pytest(args, "Running failed tests first")
 
-def run_performance_tests():
+
+def run_performance_tests(jobs="auto"):
     """Run performance tests"""
-    cmd = "pytest test_broken_link_checker.py::TestPerformance -v"
-    return run_command(cmd, "Running performance tests")
+    args = class_args("TestPerformance") + parallel_args(jobs)
+    return run_pytest(args, "Running performance tests")
 
 
-def generate_html_report():
+def generate_html_report(jobs="auto"):
     """Generate HTML test report"""
-    cmd = "pytest test_broken_link_checker.py --html=test_report.html --self-contained-html"
-    return run_command(cmd, "Generating HTML test report")
+    args = PYTEST_BASE + parallel_args(jobs) + [
+        "--html=test_report.html", "--self-contained-html"]
+    return run_pytest(args, "Generating HTML test report")
 
 
 def lint_code():
     """Run code linting"""
-    print("🔍 Running code linting...")
-    commands = [
-        "flake8 broken_link_checker.py --max-line-length=88",
-        "pylint broken_link_checker.py --score=yes",
-    ]
-    
-    success = True
-    for cmd in commands:
-        if not run_command(cmd):
-            success = False
-    
-    return success
+    # One ruff process covers the pycodestyle/pyflakes (flake8) and pylint rule sets;
+    # rules and line length live in ruff.toml
+    cmd = [sys.executable, "-m", "ruff", "check", "broken_link_checker.py"]
+    return run_command(cmd, "Running code linting")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Test runner for Broken Link Checker")
     parser.add_argument("--install", action="store_true", help="Install test dependencies")
+    parser.add_argument("--force-install", action="store_true",
+                        help="Install test dependencies even if test_requirements.txt is unchanged")
     parser.add_argument("--unit", action="store_true", help="Run unit tests")
     parser.add_argument("--integration", action="store_true", help="Run integration tests")
     parser.add_argument("--edge", action="store_true", help="Run edge case tests")
@@ -102,6 +171,11 @@ def main():
     parser.add_argument("--quick", action="store_true", help="Run quick tests (no slow tests)")
     parser.add_argument("--html", action="store_true", help="Generate HTML test report")
     parser.add_argument("--lint", action="store_true", help="Run code linting")
+    parser.add_argument("--lf", action="store_true", help="Re-run only last failed tests, stop on first failure")
+    parser.add_argument("--ff", action="store_true", help="Run all tests, last failed first")
+    parser.add_argument("--cache", action="store_true", help="Let --quick write the pytest cache (off by default)")
+    parser.add_argument("--jobs", default="auto", metavar="N",
+                        help="Number of pytest-xdist workers (default: auto, one per CPU)")
     
     args = parser.parse_args()
     
@@ -112,33 +186,40 @@ def main():
         print("  python run_tests.py --unit       # Run unit tests")
         print("  python run_tests.py --all        # Run all tests")
         print("  python run_tests.py --html       # Generate HTML report")
+        print("  python run_tests.py --lf         # Re-run what failed last time")
         return
     
     success = True
     
-    if args.install:
-        success &= install_dependencies()
+    if args.install or args.force_install:
+        success &= install_dependencies(force=args.force_install)
     
     if args.unit:
-        success &= run_unit_tests()
+        success &= run_unit_tests(args.jobs)
     
     if args.integration:
-        success &= run_integration_tests()
+        success &= run_integration_tests(args.jobs)
     
     if args.edge:
-        success &= run_edge_case_tests()
+        success &= run_edge_case_tests(args.jobs)
     
     if args.performance:
-        success &= run_performance_tests()
+        success &= run_performance_tests(args.jobs)
     
     if args.all:
-        success &= run_all_tests()
+        success &= run_all_tests(args.jobs)
     
     if args.quick:
-        success &= run_quick_tests()
+        success &= run_quick_tests(args.jobs, args.cache)
+    
+    if args.lf:
+        success &= run_last_failed()
+    
+    if args.ff:
+        success &= run_failed_first(args.jobs)
     
     if args.html:
-        success &= generate_html_report()
+        success &= generate_html_report(args.jobs)
     
     if args.lint:
         success &= lint_code()
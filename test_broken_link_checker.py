@@ -1,23 +1,23 @@
+import asyncio
+import httpx
+from collections import deque
 import pytest
 import requests
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, MagicMock
+from types import SimpleNamespace
 from datetime import datetime, timedelta
 import json
 import csv
 import tempfile
 import os
-from broken_link_checker import BrokenLinkChecker
+import logging
+import broken_link_checker
+from broken_link_checker import BrokenLinkChecker, LinkResult, LinkError, MAX_PAGE_BYTES, configure_logging
 
 
 class TestBrokenLinkChecker:
     """Test suite for BrokenLinkChecker class"""
     
-    def setup_method(self):
-        """Set up test fixtures before each test method"""
-        self.checker = BrokenLinkChecker(max_urls=10, max_depth=1, delay=0.1)
-        self.test_url = "https://example.com"
-        self.test_domain = "example.com"
-    
     def test_initialization(self):
         """Test BrokenLinkChecker initialization"""
         checker = BrokenLinkChecker(max_urls=50, max_depth=3, delay=2.0, same_domain_only=False)
@@ -25,47 +25,68 @@ class TestBrokenLinkChecker:
         assert checker.max_depth == 3
         assert checker.delay == 2.0
         assert checker.same_domain_only == False
-        assert checker.visited_urls == set()
-        assert checker.checked_urls == set()
+        assert len(checker.visited_urls) == 0
+        assert len(checker.checked_urls) == 0
         assert checker.broken_links == []
         assert checker.working_links == []
         assert checker.error_links == []
         assert checker.urls_processed == 0
         assert checker.start_domain is None
     
-    def test_is_valid_url(self):
+    def test_is_valid_url(self, shared_checker):
         """Test URL validation"""
         # Valid URLs
-        assert self.checker.is_valid_url("https://example.com") == True
-        assert self.checker.is_valid_url("http://example.com") == True
-        assert self.checker.is_valid_url("https://subdomain.example.com/path") == True
+        assert shared_checker.is_valid_url("https://example.com") == True
+        assert shared_checker.is_valid_url("http://example.com") == True
+        assert shared_checker.is_valid_url("https://subdomain.example.com/path") == True
         
         # Invalid URLs
-        assert self.checker.is_valid_url("") == False
-        assert self.checker.is_valid_url("not-a-url") == False
-        assert self.checker.is_valid_url("ftp://example.com") == True  # Has scheme and netloc
-        assert self.checker.is_valid_url("//example.com") == False  # No scheme
+        assert shared_checker.is_valid_url("") == False
+        assert shared_checker.is_valid_url("not-a-url") == False
+        assert shared_checker.is_valid_url("ftp://example.com") == True  # Has scheme and netloc
+        assert shared_checker.is_valid_url("//example.com") == False  # No scheme
     
-    def test_is_same_domain(self):
+    def test_is_same_domain(self, checker):
         """Test domain filtering"""
-        self.checker.start_domain = "example.com"
-        self.checker.same_domain_only = True
+        checker.start_domain = "example.com"
+        checker.same_domain_only = True
         
         # Same domain
-        assert self.checker.is_same_domain("https://example.com") == True
-        assert self.checker.is_same_domain("https://example.com/path") == True
+        assert checker.is_same_domain("https://example.com") == True
+        assert checker.is_same_domain("https://example.com/path") == True
         
         # Different domain
-        assert self.checker.is_same_domain("https://other.com") == False
-        assert self.checker.is_same_domain("https://subdomain.example.com") == False
+        assert checker.is_same_domain("https://other.com") == False
+        assert checker.is_same_domain("https://subdomain.example.com") == False
         
         # When same_domain_only is False
-        self.checker.same_domain_only = False
-        assert self.checker.is_same_domain("https://other.com") == True
+        checker.same_domain_only = False
+        assert checker.is_same_domain("https://other.com") == True
     
-    @patch('requests.get')
-    def test_get_all_links_success(self, mock_get):
+    def test_normalize(self, shared_checker):
+        """Test URL normalization used for deduplication"""
+        assert shared_checker._normalize("https://example.com") == "https://example.com"
+        assert shared_checker._normalize("HTTPS://Example.COM:443/Path") == "https://example.com/Path"
+        assert shared_checker._normalize("http://example.com:80/a#top") == "http://example.com/a"
+        assert shared_checker._normalize("http://example.com:8080/a") == "http://example.com:8080/a"
+        assert (shared_checker._normalize("https://example.com/a?b=1&a=2")
+                == shared_checker._normalize("https://example.com/a?a=2&b=1"))
+    
+    def test_queue_links_skips_repeats(self, checker):
+        """Test that a link found on several pages is queued for crawling once"""
+        frontier = deque()
+        checker._queue_links(frontier, ["https://example.com/a", "https://example.com/b"], 1)
+        checker._queue_links(frontier, ["https://example.com/a#top", "https://example.com/c"], 2)
+        
+        assert list(frontier) == [
+            ("https://example.com/a", 1),
+            ("https://example.com/b", 1),
+            ("https://example.com/c", 2),
+        ]
+    
+    def test_get_all_links_success(self, checker, mocked_http):
         """Test successful link extraction"""
+        mock_get, _ = mocked_http
         html_content = """
         <html>
         <body>
@@ -78,22 +99,23 @@ class TestBrokenLinkChecker:
         """
         
         mock_response = Mock()
-        mock_response.text = html_content
+        mock_response.headers = {'Content-Type': 'text/html'}
+        mock_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_response
         
-        self.checker.start_domain = "example.com"
-        self.checker.same_domain_only = True
+        checker.start_domain = "example.com"
+        checker.same_domain_only = True
         
-        links = self.checker.get_all_links("https://example.com")
+        links = checker.get_all_links("https://example.com")
         
         # Should contain same-domain links only
         assert "https://example.com/page1" in links
         assert "https://example.com/page2" in links
         assert "https://external.com" not in links
     
-    @patch('requests.get')
-    def test_get_all_links_with_external(self, mock_get):
+    def test_get_all_links_with_external(self, checker, mocked_http):
         """Test link extraction with external links enabled"""
+        mock_get, _ = mocked_http
         html_content = """
         <html>
         <body>
@@ -104,117 +126,233 @@ class TestBrokenLinkChecker:
         """
         
         mock_response = Mock()
-        mock_response.text = html_content
+        mock_response.headers = {'Content-Type': 'text/html'}
+        mock_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_response
         
-        self.checker.same_domain_only = False
+        checker.same_domain_only = False
         
-        links = self.checker.get_all_links("https://example.com")
+        links = checker.get_all_links("https://example.com")
         
         # Should contain all valid links
         assert "https://example.com/page1" in links
         assert "https://external.com" in links
     
-    @patch('requests.get')
-    def test_get_all_links_request_error(self, mock_get):
+    def test_get_all_links_skips_non_html(self, checker, mocked_http):
+        """Test that non-HTML responses are not read or parsed"""
+        mock_get, _ = mocked_http
+        mock_response = Mock()
+        mock_response.headers = {'Content-Type': 'application/pdf'}
+        mock_get.return_value = mock_response
+        
+        links = checker.get_all_links("https://example.com/file.pdf")
+        
+        assert links == set()
+        mock_response.raw.read.assert_not_called()
+        mock_response.close.assert_called_once()
+    
+    def test_get_all_links_caps_body_size(self, checker, mocked_http):
+        """Test that only a bounded prefix of the page is read"""
+        mock_get, _ = mocked_http
+        mock_response = Mock()
+        mock_response.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        mock_response.raw.read.return_value = b'<a href="/page1">Page 1</a>'
+        mock_get.return_value = mock_response
+        
+        links = checker.get_all_links("https://example.com")
+        
+        assert links == {"https://example.com/page1"}
+        assert mock_get.call_args.kwargs['stream'] == True
+        mock_response.raw.read.assert_called_once_with(MAX_PAGE_BYTES, decode_content=True)
+    
+    def test_get_all_links_header_charset(self, checker, mocked_http):
+        """Test that a non-UTF-8 page is decoded with its Content-Type charset"""
+        mock_get, _ = mocked_http
+        mock_response = Mock()
+        mock_response.headers = requests.structures.CaseInsensitiveDict(
+            {'Content-Type': 'text/html; charset=windows-1252'})
+        mock_response.raw.read.return_value = '<a href="/café">Café</a>'.encode('windows-1252')
+        mock_get.return_value = mock_response
+        
+        links = checker.get_all_links("https://example.com")
+        
+        assert links == {"https://example.com/café"}
+    
+    def test_get_all_links_meta_charset(self, checker, mocked_http):
+        """Test that <meta charset> is honoured when the header names no charset"""
+        mock_get, _ = mocked_http
+        mock_response = Mock()
+        mock_response.headers = requests.structures.CaseInsensitiveDict({'Content-Type': 'text/html'})
+        html = '<meta charset="iso-8859-1"><a href="/naïve">Naïve</a>'
+        mock_response.raw.read.return_value = html.encode('iso-8859-1')
+        mock_get.return_value = mock_response
+        
+        links = checker.get_all_links("https://example.com")
+        
+        assert links == {"https://example.com/naïve"}
+    
+    def test_get_all_links_not_modified(self, checker, mocked_http):
+        """Test that a 304 reuses the links cached by a previous scan"""
+        mock_get, _ = mocked_http
+        mock_response = Mock()
+        mock_response.status_code = 304
+        mock_response.headers = {'ETag': '"v1"'}
+        mock_get.return_value = mock_response
+        
+        checker.previous_page_cache = {
+            "https://example.com": {'etag': '"v1"', 'last_modified': None, 'links': ["https://example.com/page1"]}
+        }
+        
+        links = checker.get_all_links("https://example.com")
+        
+        assert links == {"https://example.com/page1"}
+        assert mock_get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        mock_response.raw.read.assert_not_called()
+        assert checker.page_cache["https://example.com"]['links'] == ["https://example.com/page1"]
+    
+    def test_get_all_links_request_error(self, checker, mocked_http):
         """Test link extraction when request fails"""
+        mock_get, _ = mocked_http
         mock_get.side_effect = requests.exceptions.RequestException("Connection error")
         
-        links = self.checker.get_all_links("https://example.com")
+        links = checker.get_all_links("https://example.com")
         
         assert links == set()
-        assert len(self.checker.error_links) == 1
-        assert self.checker.error_links[0]['url'] == "https://example.com"
-        assert self.checker.error_links[0]['type'] == 'extraction'
-        assert "Connection error" in self.checker.error_links[0]['error']
+        assert len(checker.error_links) == 1
+        assert checker.error_links[0].url == "https://example.com"
+        assert checker.error_links[0].type == 'extraction'
+        assert "Connection error" in checker.error_links[0].error
     
-    @patch('requests.head')
-    def test_check_link_working(self, mock_head):
+    def test_check_link_working(self, checker, mocked_http):
         """Test checking a working link"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.com"
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=200, url="https://example.com")
         mock_head.return_value = mock_response
         
-        self.checker.check_link("https://example.com")
+        checker.check_link("https://example.com")
         
-        assert "https://example.com" in self.checker.checked_urls
-        assert len(self.checker.working_links) == 1
-        assert self.checker.working_links[0]['url'] == "https://example.com"
-        assert self.checker.working_links[0]['status_code'] == 200
-        assert self.checker.urls_processed == 1
+        assert "https://example.com" in checker.checked_urls
+        assert len(checker.working_links) == 1
+        assert checker.working_links[0].url == "https://example.com"
+        assert checker.working_links[0].status_code == 200
+        assert checker.urls_processed == 1
     
-    @patch('requests.head')
-    def test_check_link_broken(self, mock_head):
+    def test_check_link_broken(self, checker, mocked_http):
         """Test checking a broken link"""
-        mock_response = Mock()
-        mock_response.status_code = 404
-        mock_response.url = "https://example.com/notfound"
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=404, url="https://example.com/notfound")
         mock_head.return_value = mock_response
         
-        self.checker.check_link("https://example.com/notfound")
+        checker.check_link("https://example.com/notfound")
         
-        assert len(self.checker.broken_links) == 1
-        assert self.checker.broken_links[0]['url'] == "https://example.com/notfound"
-        assert self.checker.broken_links[0]['status_code'] == 404
+        assert len(checker.broken_links) == 1
+        assert checker.broken_links[0].url == "https://example.com/notfound"
+        assert checker.broken_links[0].status_code == 404
     
-    @patch('requests.head')
-    def test_check_link_redirect(self, mock_head):
+    def test_check_link_redirect(self, checker, mocked_http):
         """Test checking a link that redirects"""
-        mock_response = Mock()
-        mock_response.status_code = 301
-        mock_response.url = "https://example.com/new-location"
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=301, url="https://example.com/new-location")
         mock_head.return_value = mock_response
         
-        self.checker.check_link("https://example.com/old-location")
+        checker.check_link("https://example.com/old-location")
+        
+        assert len(checker.working_links) == 1
+        assert checker.working_links[0].final_url == "https://example.com/new-location"
+    
+    def test_check_link_head_not_allowed(self, checker, mocked_http):
+        """Test falling back to GET when a host rejects HEAD"""
+        mock_get, mock_head = mocked_http
+        mock_head_response = SimpleNamespace(status_code=405, url="https://example.com/page1")
+        mock_head.return_value = mock_head_response
+        
+        def mock_get_side_effect(url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            response.url = url
+            return response
+        
+        mock_get.side_effect = mock_get_side_effect
         
-        assert len(self.checker.working_links) == 1
-        assert self.checker.working_links[0]['final_url'] == "https://example.com/new-location"
+        checker.check_link("https://example.com/page1")
+        checker.check_link("https://example.com/page2")
+        
+        assert len(checker.working_links) == 2
+        assert checker.broken_links == []
+        assert checker.head_ok == {"example.com": False}
+        # HEAD is skipped entirely once the host is known to reject it
+        assert mock_head.call_count == 1
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs['stream'] == True
     
-    @patch('requests.head')
-    def test_check_link_error(self, mock_head):
+    def test_check_link_error(self, checker, mocked_http):
         """Test checking a link that causes an error"""
+        _, mock_head = mocked_http
         mock_head.side_effect = requests.exceptions.Timeout("Request timeout")
         
-        self.checker.check_link("https://timeout.com")
+        checker.check_link("https://timeout.com")
         
-        assert len(self.checker.error_links) == 1
-        assert self.checker.error_links[0]['url'] == "https://timeout.com"
-        assert self.checker.error_links[0]['type'] == 'check'
-        assert "Request timeout" in self.checker.error_links[0]['error']
+        assert len(checker.error_links) == 1
+        assert checker.error_links[0].url == "https://timeout.com"
+        assert checker.error_links[0].type == 'check'
+        assert "Request timeout" in checker.error_links[0].error
     
-    def test_check_link_duplicate(self):
+    def test_check_link_duplicate(self, checker, mocked_http):
         """Test that duplicate URLs are not checked twice"""
-        with patch('requests.head') as mock_head:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.url = "https://example.com"
-            mock_head.return_value = mock_response
-            
-            # Check the same URL twice
-            self.checker.check_link("https://example.com")
-            self.checker.check_link("https://example.com")
-            
-            # Should only be called once
-            assert mock_head.call_count == 1
-            assert self.checker.urls_processed == 1
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=200, url="https://example.com")
+        mock_head.return_value = mock_response
+        
+        # Check the same URL twice
+        checker.check_link("https://example.com")
+        checker.check_link("https://example.com")
+        
+        # Should only be called once
+        assert mock_head.call_count == 1
+        assert checker.urls_processed == 1
+    
+    def test_check_link_stops_at_max_urls(self, checker, mocked_http):
+        """Test that concurrent checks never exceed max_urls"""
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=200, url="https://example.com")
+        mock_head.return_value = mock_response
+        
+        checker.delay = 0
+        urls = [f"https://example.com/page{i}" for i in range(25)]
+        list(checker.executor.map(checker.check_link, urls))
+        
+        assert checker.urls_processed == 10
+        assert len(checker.working_links) == 10
+        assert mock_head.call_count == 10
+    
+    def test_check_link_normalized_duplicate(self, checker, mocked_http):
+        """Test that URLs differing only in fragment, case or query order are checked once"""
+        _, mock_head = mocked_http
+        mock_response = SimpleNamespace(status_code=200, url="https://example.com/a")
+        mock_head.return_value = mock_response
+        
+        checker.check_link("https://example.com/a?x=1&y=2")
+        checker.check_link("https://EXAMPLE.com/a?y=2&x=1#section")
+        
+        assert mock_head.call_count == 1
+        assert checker.working_links[0].url == "https://example.com/a?x=1&y=2"
     
-    def test_get_results_json(self):
+    def test_get_results_json(self, checker):
         """Test JSON results generation"""
         # Add some test data
-        self.checker.working_links = [
-            {'url': 'https://example.com', 'status_code': 200, 'final_url': 'https://example.com', 'timestamp': '2024-01-01T00:00:00'}
+        checker.working_links = [
+            LinkResult('https://example.com', 200, 'https://example.com', '2024-01-01T00:00:00')
         ]
-        self.checker.broken_links = [
-            {'url': 'https://example.com/404', 'status_code': 404, 'final_url': 'https://example.com/404', 'timestamp': '2024-01-01T00:01:00'}
+        checker.broken_links = [
+            LinkResult('https://example.com/404', 404, 'https://example.com/404', '2024-01-01T00:01:00')
         ]
-        self.checker.error_links = [
-            {'url': 'https://timeout.com', 'error': 'Timeout', 'type': 'check', 'timestamp': '2024-01-01T00:02:00'}
+        checker.error_links = [
+            LinkError('https://timeout.com', 'Timeout', 'check', '2024-01-01T00:02:00')
         ]
-        self.checker.urls_processed = 3
-        self.checker.start_domain = "example.com"
+        checker.urls_processed = 3
+        checker.start_domain = "example.com"
         
-        results = self.checker.get_results_json()
+        results = checker.get_results_json()
         
         assert 'scan_info' in results
         assert 'statistics' in results
@@ -225,23 +363,43 @@ class TestBrokenLinkChecker:
         assert results['statistics']['working_links_count'] == 1
         assert results['statistics']['broken_links_count'] == 1
         assert results['statistics']['error_links_count'] == 1
+        assert results['results']['error_links'][0] == {
+            'url': 'https://timeout.com', 'error': 'Timeout', 'type': 'check', 'timestamp': '2024-01-01T00:02:00'
+        }
         
         # Check scan info
         assert results['scan_info']['start_domain'] == "example.com"
         assert results['scan_info']['max_urls'] == 10
     
-    def test_save_json_report(self):
+    def test_get_results_json_cached(self, checker):
+        """Test that results are rebuilt only after the scan progresses"""
+        first = checker.get_results_json()
+        assert checker.get_results_json() is first
+        
+        checker._record_error("https://example.com", "Connection error", 'extraction')
+        second = checker.get_results_json()
+        
+        assert second is not first
+        assert second['statistics']['error_links_count'] == 1
+        
+        # Replacing a list with one of the same length must not serve stale results
+        checker.error_links = [LinkError("https://example.com/other", "Timeout", 'check', '2024-01-01T00:00:00')]
+        third = checker.get_results_json()
+        
+        assert third['results']['error_links'][0]['url'] == "https://example.com/other"
+    
+    def test_save_json_report(self, checker):
         """Test JSON report saving"""
         # Add test data
-        self.checker.working_links = [
-            {'url': 'https://example.com', 'status_code': 200, 'final_url': 'https://example.com', 'timestamp': '2024-01-01T00:00:00'}
+        checker.working_links = [
+            LinkResult('https://example.com', 200, 'https://example.com', '2024-01-01T00:00:00')
         ]
         
         with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
             temp_filename = f.name
         
         try:
-            result = self.checker.save_json_report(temp_filename)
+            result = checker.save_json_report(temp_filename)
             assert result == True
             
             # Verify file contents
@@ -253,24 +411,24 @@ class TestBrokenLinkChecker:
         finally:
             os.unlink(temp_filename)
     
-    def test_save_csv_report(self):
+    def test_save_csv_report(self, checker):
         """Test CSV report saving"""
         # Add test data
-        self.checker.working_links = [
-            {'url': 'https://example.com', 'status_code': 200, 'final_url': 'https://example.com', 'timestamp': '2024-01-01T00:00:00'}
+        checker.working_links = [
+            LinkResult('https://example.com', 200, 'https://example.com', '2024-01-01T00:00:00')
         ]
-        self.checker.broken_links = [
-            {'url': 'https://example.com/404', 'status_code': 404, 'final_url': 'https://example.com/404', 'timestamp': '2024-01-01T00:01:00'}
+        checker.broken_links = [
+            LinkResult('https://example.com/404', 404, 'https://example.com/404', '2024-01-01T00:01:00')
         ]
-        self.checker.error_links = [
-            {'url': 'https://timeout.com', 'error': 'Timeout', 'type': 'check', 'timestamp': '2024-01-01T00:02:00'}
+        checker.error_links = [
+            LinkError('https://timeout.com', 'Timeout', 'check', '2024-01-01T00:02:00')
         ]
         
         with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
             temp_filename = f.name
         
         try:
-            result = self.checker.save_csv_report(temp_filename)
+            result = checker.save_csv_report(temp_filename)
             assert result == True
             
             # Verify file contents
@@ -305,10 +463,13 @@ class TestBrokenLinkCheckerIntegration:
         """Set up test fixtures"""
         self.checker = BrokenLinkChecker(max_urls=5, max_depth=1, delay=0.1)
     
-    @patch('requests.get')
-    @patch('requests.head')
-    def test_crawl_website_basic(self, mock_head, mock_get):
+    def teardown_method(self):
+        """Release the checker's thread pool and connections"""
+        self.checker.close()
+    
+    def test_crawl_website_basic(self, mocked_http):
         """Test basic website crawling"""
+        mock_get, mock_head = mocked_http
         # Mock the initial page
         html_content = """
         <html>
@@ -320,13 +481,12 @@ class TestBrokenLinkCheckerIntegration:
         """
         
         mock_get_response = Mock()
-        mock_get_response.text = html_content
+        mock_get_response.headers = {'Content-Type': 'text/html'}
+        mock_get_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_get_response
         
         # Mock HEAD requests for link checking
-        mock_head_response = Mock()
-        mock_head_response.status_code = 200
-        mock_head_response.url = "https://example.com"
+        mock_head_response = SimpleNamespace(status_code=200, url="https://example.com")
         mock_head.return_value = mock_head_response
         
         self.checker.crawl_website("https://example.com")
@@ -336,10 +496,9 @@ class TestBrokenLinkCheckerIntegration:
         assert self.checker.start_domain == "example.com"
         assert "https://example.com" in self.checker.visited_urls
     
-    @patch('requests.get')
-    @patch('requests.head')
-    def test_crawl_website_with_broken_links(self, mock_head, mock_get):
+    def test_crawl_website_with_broken_links(self, mocked_http):
         """Test crawling with mixed working and broken links"""
+        mock_get, mock_head = mocked_http
         html_content = """
         <html>
         <body>
@@ -350,18 +509,13 @@ class TestBrokenLinkCheckerIntegration:
         """
         
         mock_get_response = Mock()
-        mock_get_response.text = html_content
+        mock_get_response.headers = {'Content-Type': 'text/html'}
+        mock_get_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_get_response
         
         # Mock different responses for different URLs
         def mock_head_side_effect(url, **kwargs):
-            response = Mock()
-            response.url = url
-            if 'broken' in url:
-                response.status_code = 404
-            else:
-                response.status_code = 200
-            return response
+            return SimpleNamespace(status_code=404 if 'broken' in url else 200, url=url)
         
         mock_head.side_effect = mock_head_side_effect
         
@@ -371,21 +525,19 @@ class TestBrokenLinkCheckerIntegration:
         assert len(self.checker.working_links) > 0
         assert len(self.checker.broken_links) > 0
     
-    @patch('requests.get')
-    @patch('requests.head')
-    def test_crawl_website_max_urls_limit(self, mock_head, mock_get):
+    def test_crawl_website_max_urls_limit(self, mocked_http):
         """Test that max_urls limit is respected"""
+        mock_get, mock_head = mocked_http
         # Create a page with many links
         links = ['<a href="https://example.com/page{0}">Page {0}</a>'.format(i) for i in range(20)]
         html_content = f"<html><body>{''.join(links)}</body></html>"
         
         mock_get_response = Mock()
-        mock_get_response.text = html_content
+        mock_get_response.headers = {'Content-Type': 'text/html'}
+        mock_get_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_get_response
         
-        mock_head_response = Mock()
-        mock_head_response.status_code = 200
-        mock_head_response.url = "https://example.com"
+        mock_head_response = SimpleNamespace(status_code=200, url="https://example.com")
         mock_head.return_value = mock_head_response
         
         # Set a low max_urls limit
@@ -396,6 +548,89 @@ class TestBrokenLinkCheckerIntegration:
         assert self.checker.urls_processed <= 3
 
 
+    def test_crawl_website_respects_max_depth(self, mocked_http):
+        """Test that pages beyond max_depth are checked but not crawled"""
+        mock_get, mock_head = mocked_http
+        def mock_get_side_effect(url, **kwargs):
+            response = Mock()
+            response.headers = {'Content-Type': 'text/html'}
+            response.raw.read.return_value = f'<a href="{url}/next">Next</a>'.encode()
+            return response
+        
+        mock_get.side_effect = mock_get_side_effect
+        
+        mock_head_response = SimpleNamespace(status_code=200, url="https://example.com")
+        mock_head.return_value = mock_head_response
+        
+        self.checker.delay = 0
+        self.checker.crawl_website("https://example.com")
+        
+        assert len(self.checker.visited_urls) == 2
+        assert "https://example.com" in self.checker.visited_urls
+        assert "https://example.com/next" in self.checker.visited_urls
+        assert "https://example.com/next/next" in self.checker.checked_urls
+        assert mock_get.call_count == 2
+    
+    def test_crawl_website_async(self):
+        """Test the asyncio crawler against a mocked httpx transport"""
+        html_content = """
+        <html>
+        <body>
+            <a href="https://example.com/working">Working Link</a>
+            <a href="https://example.com/broken">Broken Link</a>
+        </body>
+        </html>
+        """
+        
+        def handler(request):
+            if request.method == "HEAD":
+                return httpx.Response(404 if 'broken' in str(request.url) else 200)
+            return httpx.Response(200, headers={'Content-Type': 'text/html'}, text=html_content)
+        
+        async def crawl():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                await self.checker.crawl_website_async("https://example.com", client=client)
+        
+        self.checker.delay = 0
+        asyncio.run(crawl())
+        
+        assert self.checker.start_domain == "example.com"
+        assert "https://example.com" in self.checker.visited_urls
+        assert {link.url for link in self.checker.broken_links} == {"https://example.com/broken"}
+        assert "https://example.com/working" in {link.url for link in self.checker.working_links}
+    
+    def test_get_all_links_async_header_charset(self):
+        """Test that the async path decodes a page with its Content-Type charset"""
+        def handler(request):
+            return httpx.Response(200, headers={'Content-Type': 'text/html; charset=windows-1252'},
+                                  content='<a href="/café">Café</a>'.encode('windows-1252'))
+        
+        async def extract():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await self.checker.get_all_links_async(client, "https://example.com")
+        
+        assert asyncio.run(extract()) == {"https://example.com/café"}
+    
+    def test_check_link_async_head_not_allowed(self):
+        """Test the async checker retries with GET when HEAD is rejected"""
+        methods = []
+        
+        def handler(request):
+            methods.append(request.method)
+            return httpx.Response(405 if request.method == "HEAD" else 200)
+        
+        async def check():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                await self.checker.check_link_async(client, "https://example.com/page")
+        
+        self.checker.delay = 0
+        asyncio.run(check())
+        
+        assert methods == ["HEAD", "GET"]
+        assert self.checker.head_ok == {"example.com": False}
+        assert self.checker.working_links[0].status_code == 200
+
+
 class TestBrokenLinkCheckerEdgeCases:
     """Test edge cases and error conditions"""
     
@@ -403,36 +638,43 @@ class TestBrokenLinkCheckerEdgeCases:
         """Set up test fixtures"""
         self.checker = BrokenLinkChecker(max_urls=10, max_depth=1, delay=0.1)
     
-    @patch('requests.get')
-    def test_malformed_html(self, mock_get):
+    def teardown_method(self):
+        """Release the checker's thread pool and connections"""
+        self.checker.close()
+    
+    def test_malformed_html(self, mocked_http):
         """Test handling of malformed HTML"""
+        mock_get, _ = mocked_http
         malformed_html = "<html><body><a href='unclosed link</body></html>"
         
         mock_response = Mock()
-        mock_response.text = malformed_html
+        mock_response.headers = {'Content-Type': 'text/html'}
+        mock_response.raw.read.return_value = malformed_html.encode()
         mock_get.return_value = mock_response
         
         # Should not crash on malformed HTML
         links = self.checker.get_all_links("https://example.com")
         assert isinstance(links, set)
     
-    @patch('requests.get')
-    def test_empty_html(self, mock_get):
+    def test_empty_html(self, mocked_http):
         """Test handling of empty HTML"""
+        mock_get, _ = mocked_http
         mock_response = Mock()
-        mock_response.text = ""
+        mock_response.headers = {'Content-Type': 'text/html'}
+        mock_response.raw.read.return_value = b""
         mock_get.return_value = mock_response
         
         links = self.checker.get_all_links("https://example.com")
         assert links == set()
     
-    @patch('requests.get')
-    def test_html_with_no_links(self, mock_get):
+    def test_html_with_no_links(self, mocked_http):
         """Test handling of HTML with no links"""
+        mock_get, _ = mocked_http
         html_content = "<html><body><p>No links here</p></body></html>"
         
         mock_response = Mock()
-        mock_response.text = html_content
+        mock_response.headers = {'Content-Type': 'text/html'}
+        mock_response.raw.read.return_value = html_content.encode()
         mock_get.return_value = mock_response
         
         links = self.checker.get_all_links("https://example.com")
@@ -446,13 +688,171 @@ class TestBrokenLinkCheckerEdgeCases:
         
         result = self.checker.save_csv_report("/nonexistent/path/report.csv")
         assert result == False
+    
+    def test_rejects_non_positive_concurrency(self):
+        """Test that zero workers or per-host slots fail fast instead of hanging"""
+        with pytest.raises(ValueError):
+            BrokenLinkChecker(workers=0)
+        with pytest.raises(ValueError):
+            BrokenLinkChecker(max_per_host=0)
+    
+    def test_configure_logging_installs_handler_once(self, monkeypatch):
+        """Test that configuring logging twice does not duplicate output"""
+        monkeypatch.setattr(broken_link_checker.logger, "handlers", [])
+        monkeypatch.setattr(broken_link_checker.logger, "level", broken_link_checker.logger.level)
+        
+        first = configure_logging(logging.INFO)
+        second = configure_logging(logging.DEBUG)
+        first.stop()
+        
+        assert second is first
+        assert len(broken_link_checker.logger.handlers) == 1
+        assert broken_link_checker.logger.level == logging.DEBUG
+
+
+def baseline_results(start_domain="example.com"):
+    """A get_results_json() dict as the baseline stored it: no page_cache, workers or start_url"""
+    return {
+        "scan_info": {
+            "start_time": "2024-01-01T10:00:00", "end_time": "2024-01-01T10:01:00",
+            "duration_seconds": 60.0, "start_domain": start_domain,
+            "max_urls": 10, "max_depth": 1, "delay": 0.1, "same_domain_only": True
+        },
+        "statistics": {
+            "total_urls_processed": 3, "working_links_count": 1, "broken_links_count": 1,
+            "error_links_count": 1, "visited_pages_count": 1
+        },
+        "results": {
+            "working_links": [{"url": "https://example.com/ok", "status_code": 200,
+                               "final_url": "https://example.com/ok", "timestamp": "2024-01-01T10:00:10"}],
+            "broken_links": [{"url": "https://example.com/gone", "status_code": 404,
+                              "final_url": "https://example.com/gone", "timestamp": "2024-01-01T10:00:20"}],
+            "error_links": [{"url": "https://example.com/slow", "error": "Timeout",
+                             "type": "check", "timestamp": "2024-01-01T10:00:30"}]
+        }
+    }
+
+
+class TestScanStorage:
+    """Test the API's per-scan files and the import of the legacy scan databases"""
+    
+    def test_checker_from_results(self, scan_api):
+        """Test that a stored scan is restored with LinkResult/LinkError objects"""
+        checker = scan_api.checker_from_results(baseline_results())
+        try:
+            assert checker.start_domain == "example.com"
+            assert checker.urls_processed == 3
+            assert checker.workers == 10
+            assert checker.working_links == [LinkResult("https://example.com/ok", 200,
+                                                        "https://example.com/ok", "2024-01-01T10:00:10")]
+            assert checker.broken_links[0].status_code == 404
+            assert checker.error_links == [LinkError("https://example.com/slow", "Timeout",
+                                                     "check", "2024-01-01T10:00:30")]
+        finally:
+            checker.close()
+    
+    def test_save_and_load_round_trip(self, scan_api):
+        """Test that save_scan_one/load_scans keep the results and the page cache"""
+        checker = scan_api.checker_from_results(baseline_results())
+        checker.page_cache = {"https://example.com": {
+            "etag": '"v1"', "last_modified": None, "links": ["https://example.com/ok"]}}
+        scan_api.save_scan_one("scan1", checker)
+        checker.close()
+        
+        loaded = scan_api.load_scans()
+        
+        assert list(loaded) == ["scan1"]
+        assert loaded["scan1"].page_cache == checker.page_cache
+        assert loaded["scan1"].broken_links == checker.broken_links
+        assert loaded["scan1"].error_links == checker.error_links
+        loaded["scan1"].close()
+    
+    def test_migrates_legacy_json(self, scan_api):
+        """Test that a baseline scan_db.json is imported once and then set aside"""
+        with open("scan_db.json", "wb") as f:
+            f.write(json.dumps({"old1": baseline_results(), "old2": baseline_results("other.com")}).encode())
+        
+        loaded = scan_api.load_scans()
+        
+        assert sorted(loaded) == ["old1", "old2"]
+        assert loaded["old2"].start_domain == "other.com"
+        assert loaded["old1"].broken_links[0].url == "https://example.com/gone"
+        assert not os.path.exists("scan_db.json")
+        assert os.path.exists("scan_db.json.migrated")
+        assert os.path.exists(os.path.join("scan_db", "old1.json"))
+        for checker in loaded.values():
+            checker.close()
+    
+    def test_migrates_legacy_jsonl_with_torn_line(self, scan_api):
+        """Test that a scan_db.jsonl cut off mid-append still imports its whole lines"""
+        line = json.dumps({"scan_id": "old1", "results": baseline_results()})
+        with open("scan_db.jsonl", "w") as f:
+            f.write(line + "\n\n" + line[:40])
+        
+        loaded = scan_api.load_scans()
+        
+        assert list(loaded) == ["old1"]
+        assert loaded["old1"].urls_processed == 3
+        assert os.path.exists("scan_db.jsonl.migrated")
+        loaded["old1"].close()
+    
+    def test_existing_scan_file_wins_over_legacy(self, scan_api):
+        """Test that migration never overwrites a scan that already has its own file"""
+        current = baseline_results("current.com")
+        with open(os.path.join("scan_db", "old1.json"), "w") as f:
+            json.dump(current, f)
+        with open("scan_db.json", "w") as f:
+            json.dump({"old1": baseline_results("legacy.com")}, f)
+        
+        loaded = scan_api.load_scans()
+        
+        assert loaded["old1"].start_domain == "current.com"
+        assert os.path.exists("scan_db.json.migrated")
+        loaded["old1"].close()
 
 
 # Pytest fixtures
+@pytest.fixture(autouse=True)
+def mocked_http(monkeypatch):
+    """Replace Session.get/head for every test so none can reach the network; yields (get, head)"""
+    get, head = MagicMock(), MagicMock()
+    monkeypatch.setattr(requests.Session, 'get', get)
+    monkeypatch.setattr(requests.Session, 'head', head)
+    yield get, head
+
+
+@pytest.fixture
+def checker():
+    """A fresh BrokenLinkChecker for tests that change its state"""
+    checker = BrokenLinkChecker(max_urls=10, max_depth=1, delay=0.1)
+    yield checker
+    checker.close()
+
+
+@pytest.fixture
+def scan_api(tmp_path, monkeypatch):
+    """broken_link_checker_api with its storage in an empty temporary directory"""
+    # The module creates its directories and loads scans on import, relative to the cwd
+    monkeypatch.chdir(tmp_path)
+    api = pytest.importorskip("broken_link_checker_api")
+    os.makedirs(api.SCAN_DB_DIR, exist_ok=True)
+    return api
+
+
+@pytest.fixture(scope="session")
+def shared_checker():
+    """One BrokenLinkChecker for tests that never change its state"""
+    checker = BrokenLinkChecker(max_urls=10, max_depth=1, delay=0.1)
+    yield checker
+    checker.close()
+
+
 @pytest.fixture
 def sample_checker():
     """Fixture providing a sample BrokenLinkChecker instance"""
-    return BrokenLinkChecker(max_urls=10, max_depth=2, delay=0.1)
+    checker = BrokenLinkChecker(max_urls=10, max_depth=2, delay=0.1)
+    yield checker
+    checker.close()
 
 
 @pytest.fixture
@@ -487,6 +887,11 @@ class TestPerformance:
         # Should handle large sets efficiently
         assert len(checker.visited_urls) == 1000
         assert f"https://example.com/page500" in checker.visited_urls
+        assert "https://example.com/page1000" not in checker.visited_urls
+        
+        checker.visited_urls.discard("https://example.com/page500")
+        assert "https://example.com/page500" not in checker.visited_urls
+        assert len(checker.visited_urls) == 999
 
 
 if __name__ == "__main__":